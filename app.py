@@ -4,10 +4,14 @@ Document Automation Web Application
 FastAPI application for extracting data from passport and G-28 forms
 and automatically populating web forms using browser automation.
 """
+import asyncio
 import logging
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
-from datetime import datetime
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -18,27 +22,44 @@ from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.requests import Request
 from pydantic import BaseModel
+from anyio import to_thread
 
 from models import ExtractedFormData, PassportData, AttorneyData
 from extractors.passport_extractor import PassportExtractor
 from extractors.g28_extractor import G28Extractor
+from session_store import create_session_store
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Document Automation System", version="1.0.0")
+passport_extractor = PassportExtractor()
+g28_extractor = G28Extractor()
+session_store = create_session_store()
+
+#threads for blocking work, in both asyncio's default executor and anyio's threadpool
+THREADPOOL_SIZE = 64
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #extraction offloads via asyncio.to_thread, which uses the loop's default executor (min(32, cpu+4) threads)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREADPOOL_SIZE, thread_name_prefix="app-io")
+    )
+    #spooled upload reads run in anyio's threadpool instead, allow more than its default 40 at once
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+    await passport_extractor.aclose()
+    await session_store.close()
+
+
+app = FastAPI(title="Document Automation System", version="1.0.0", lifespan=lifespan)
 
 BASE_DIR = Path(__file__).parent
-UPLOAD_DIR = BASE_DIR / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
 
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
 templates = Jinja2Templates(directory=BASE_DIR / "templates")
 
-passport_extractor = PassportExtractor()
-g28_extractor = G28Extractor()
-extraction_store: dict[str, ExtractedFormData] = {}
-
 
 class ExtractionResponse(BaseModel):
     success: bool
@@ -59,7 +80,7 @@ class FormFillerResponse(BaseModel):
 
 
 def generate_session_id() -> str:
-    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return secrets.token_urlsafe(12)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -81,22 +102,20 @@ async def upload_passport(file: UploadFile = File(...), session_id: Optional[str
     
     try:
         content = await file.read()
-        file_path = UPLOAD_DIR / f"passport_{session_id}{ext}"
-        file_path.write_bytes(content)
         
-        passport_data = passport_extractor.extract(file_path, content)
+        #extractors only use the path for its suffix when bytes are given
+        passport_data = await passport_extractor.extract(Path(file.filename), content)
         
-        if session_id not in extraction_store:
-            extraction_store[session_id] = ExtractedFormData()
-        extraction_store[session_id].passport = passport_data
+        def set_passport(data: ExtractedFormData):
+            data.passport = passport_data
         
-        file_path.unlink(missing_ok=True)
+        data = await session_store.update(session_id, set_passport)
         
         return ExtractionResponse(
             success=True,
             message=f"Passport extracted ({passport_data.extraction_method})",
             session_id=session_id,
-            data=extraction_store[session_id]
+            data=data
         )
     except Exception as e:
         logger.error(f"Passport extraction failed: {e}")
@@ -117,35 +136,33 @@ async def upload_g28(file: UploadFile = File(...), session_id: Optional[str] = N
     
     try:
         content = await file.read()
-        file_path = UPLOAD_DIR / f"g28_{session_id}{ext}"
-        file_path.write_bytes(content)
-        
-        attorney_data, beneficiary_data = g28_extractor.extract(file_path, content)
         
-        if session_id not in extraction_store:
-            extraction_store[session_id] = ExtractedFormData()
-        extraction_store[session_id].attorney = attorney_data
+        attorney_data, beneficiary_data = await g28_extractor.extract(Path(file.filename), content)
         
-        # Merge beneficiary data into passport section
-        if beneficiary_data:
-            if extraction_store[session_id].passport:
-                existing = extraction_store[session_id].passport
-                if not existing.last_name:
-                    existing.last_name = beneficiary_data.last_name
-                if not existing.first_name:
-                    existing.first_name = beneficiary_data.first_name
-                if not existing.middle_name:
-                    existing.middle_name = beneficiary_data.middle_name
-            else:
-                extraction_store[session_id].passport = beneficiary_data
+        def merge_g28(data: ExtractedFormData):
+            data.attorney = attorney_data
+            
+            # Merge beneficiary data into passport section
+            if beneficiary_data:
+                if data.passport:
+                    existing = data.passport
+                    if not existing.last_name:
+                        existing.last_name = beneficiary_data.last_name
+                    if not existing.first_name:
+                        existing.first_name = beneficiary_data.first_name
+                    if not existing.middle_name:
+                        existing.middle_name = beneficiary_data.middle_name
+                else:
+                    data.passport = beneficiary_data
         
-        file_path.unlink(missing_ok=True)
+        #atomic read-modify-write, a concurrent passport upload can't be lost
+        data = await session_store.update(session_id, merge_g28)
         
         return ExtractionResponse(
             success=True,
             message=f"G-28 extracted ({attorney_data.extraction_method})",
             session_id=session_id,
-            data=extraction_store[session_id]
+            data=data
         )
     except Exception as e:
         logger.error(f"G-28 extraction failed: {e}")
@@ -155,24 +172,25 @@ async def upload_g28(file: UploadFile = File(...), session_id: Optional[str] = N
 @app.get("/extraction/{session_id}", response_model=ExtractionResponse)
 async def get_extraction(session_id: str):
     """Get extracted data for a session."""
-    if session_id not in extraction_store:
+    data = await session_store.get(session_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
     return ExtractionResponse(
         success=True,
         message="Data retrieved",
         session_id=session_id,
-        data=extraction_store[session_id]
+        data=data
     )
 
 
 @app.post("/fill-form", response_model=FormFillerResponse)
 async def fill_form(request: FormFillerRequest):
     """Fill the target form with extracted data using browser automation."""
-    if request.session_id not in extraction_store:
+    data = await session_store.get(request.session_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    data = extraction_store[request.session_id]
     if not data.passport and not data.attorney:
         raise HTTPException(status_code=400, detail="No data available")
     
@@ -194,10 +212,10 @@ async def fill_form(request: FormFillerRequest):
 @app.post("/fill-form-sync")
 async def fill_form_sync(request: FormFillerRequest):
     """Synchronous form filling - waits for completion."""
-    if request.session_id not in extraction_store:
+    data = await session_store.get(request.session_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    data = extraction_store[request.session_id]
     if not data.passport and not data.attorney:
         return {"success": False, "error": "No data available"}
     
@@ -214,12 +232,16 @@ async def fill_form_sync(request: FormFillerRequest):
 @app.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete session data."""
-    if session_id in extraction_store:
-        del extraction_store[session_id]
+    if await session_store.delete(session_id):
         return {"success": True}
     raise HTTPException(status_code=404, detail="Session not found")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    #sessions are only shared across workers when they live in Redis
+    default_workers = (os.cpu_count() or 1) if os.getenv("REDIS_URL") else 1
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+    #each worker has its own OCR pools, split the cores between them rather than running cpu² tesseracts
+    os.environ.setdefault("OCR_CONCURRENCY", str(max(1, (os.cpu_count() or 1) // workers)))
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=workers)
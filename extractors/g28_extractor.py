@@ -2,35 +2,95 @@
 G-28 form data extraction using PDF form fields and OCR fallback.
 Extracts attorney/representative information from G-28 forms.
 """
+import asyncio
+import os
 import re
+from functools import partial
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 import logging
 
 from models import AttorneyData, PassportData, normalize_state
 
+#RE2 matches in linear time, so noisy OCR text can't trigger backtracking blowups.
+#its \b, \w and \s are ASCII-only, so a non-ASCII OCR character next to a field counts as a boundary:
+#"State GAé" gives GA and "µjsmith@foo.com" gives the address, where Unicode re matched neither.
+#the re fallback runs in ASCII mode so both engines agree; only RE2's (?i) still folds ſ (long s) to s
+try:
+    import re2
+    _compile_field = re2.compile
+except ImportError:
+    _compile_field = partial(re.compile, flags=re.ASCII)
+
 logger = logging.getLogger(__name__)
 
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", os.cpu_count() or 1))
+#caps tesseract subprocesses across all concurrent extractions in this process
+_OCR_SLOTS = asyncio.Semaphore(OCR_CONCURRENCY)
+#per-page tesseract limit, unset means none (aiopytesseract's own default of 30 s drops slow 300 dpi pages)
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT_SECONDS", "0")) or None
+
+#OCR-text field patterns, compiled once at import (inline flags work in both engines)
+_RE_LAST = _compile_field(r'(?i)(?:Family\s*Name|Last\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']+)')
+_RE_FIRST = _compile_field(r'(?i)(?:Given\s*Name|First\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']+)')
+_RE_MIDDLE = _compile_field(r'(?i)(?:Middle\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']*)')
+_RE_STREET = _compile_field(r'(?i)(?:Street|Address)[^A-Za-z0-9]*(\d+[^,\n]{5,50})')
+_RE_CITY = _compile_field(r'(?:City|Town)[^A-Za-z]*([A-Z][A-Za-z\s]{2,30}?)(?:,|\s+[A-Z]{2}\s)')
+_RE_CITY_STATE_SUFFIX = re.compile(r'\s+[A-Z]{2}$')
+_RE_STATE = _compile_field(r'(?:State)[^A-Za-z]*([A-Z]{2})\b')
+_RE_ZIP = _compile_field(r'(?i)(?:ZIP|Postal)[^0-9]*(\d{5}(?:-\d{4})?)')
+_RE_EMAIL = _compile_field(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_RE_BAR = _compile_field(r'(?i)(?:Bar\s*Number)[^A-Za-z0-9]*([A-Z0-9]{4,12})')
+_RE_LICENSING = _compile_field(r'(?i)(?:Licensing\s*Authority)[^A-Za-z]*([A-Za-z][A-Za-z\s]+?)(?:,|\.)')
+_RE_FIRM = _compile_field(r'(?i)(?:Law\s*Firm|Organization)[^A-Za-z]*([A-Za-z][^,\n]{5,60})')
+_RE_WHITESPACE = re.compile(r'\s+')
+
+#every casing of N/A, so form values need no .upper() copy to be filtered
+_SKIP_VALUES = frozenset({'', 'N/A', 'n/a', 'N/a', 'n/A'})
+
+
+async def _to_thread_settled(func, *args):
+    """asyncio.to_thread that, when cancelled, waits for the thread before re-raising,
+    so the document it's reading isn't closed under it."""
+    task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait({task})
+        raise
+
 
 class G28Extractor:
     """G-28 form extractor using PDF form fields with OCR fallback."""
     
-    def extract(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Tuple[AttorneyData, Optional[PassportData]]:
+    async def extract(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Tuple[AttorneyData, Optional[PassportData]]:
         """Extract attorney data from G-28 form."""
-        #for fillable PDFs, extracting using PDF form fields
         if file_path.suffix.lower() == ".pdf":
-            form_data, beneficiary = self._extract_pdf_form_fields(file_path, file_bytes)
-            if form_data and self._calculate_confidence(form_data) > 0.3:
-                form_data.extraction_method = "PDF_FORM_FIELDS"
-                return form_data, beneficiary
-        
-        #fallback to OCR
-        images = self._get_images(file_path, file_bytes)
-        full_text = ""
-        for img in images:
-            text = self._ocr_image(img)
-            if text:
-                full_text += text + "\n"
+            doc = await asyncio.to_thread(self._open_pdf, file_path, file_bytes)
+            if doc is None:
+                return AttorneyData(extraction_method="FAILED", confidence_score=0.0), None
+            
+            #one parsed document serves both the form-field and OCR paths
+            with doc:
+                #for fillable PDFs, extracting using PDF form fields
+                form_data, beneficiary = await _to_thread_settled(self._extract_pdf_form_fields, doc)
+                if form_data and self._calculate_confidence(form_data) > 0.3:
+                    form_data.extraction_method = "PDF_FORM_FIELDS"
+                    return form_data, beneficiary
+                
+                #text-layer PDFs (e.g. flattened e-filings) need no rasterizing or OCR
+                text_layer = await _to_thread_settled(self._extract_text_layer, doc)
+                if len(text_layer.strip()) > 500:
+                    text_data = self._extract_from_text(text_layer)
+                    text_data.confidence_score = self._calculate_confidence(text_data)
+                    if text_data.confidence_score > 0.3:
+                        text_data.extraction_method = "PDF_TEXT"
+                        return text_data, None
+                
+                #fallback to OCR, pages flow through render -> OCR -> collect stages
+                full_text = await self._ocr_pipeline(self._render_pages_fitz(doc))
+        else:
+            full_text = await self._ocr_pipeline(self._read_image(file_path, file_bytes))
         
         if full_text:
             data = self._extract_from_text(full_text)
@@ -40,26 +100,32 @@ class G28Extractor:
         
         return AttorneyData(extraction_method="FAILED", confidence_score=0.0), None
     
-    def _extract_pdf_form_fields(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Tuple[Optional[AttorneyData], Optional[PassportData]]:
-        """Extract data from PDF form fields."""
+    def _open_pdf(self, file_path: Path, file_bytes: Optional[bytes] = None):
+        """Open the PDF with PyMuPDF, or None if it can't be parsed."""
         try:
             import fitz
-            doc = fitz.open(stream=file_bytes, filetype="pdf") if file_bytes else fitz.open(str(file_path))
-            
+            return fitz.open(stream=file_bytes, filetype="pdf") if file_bytes else fitz.open(str(file_path))
+        except Exception as e:
+            logger.error(f"Failed to open PDF: {e}")
+            return None
+    
+    def _extract_pdf_form_fields(self, doc) -> Tuple[Optional[AttorneyData], Optional[PassportData]]:
+        """Extract data from PDF form fields of an open document."""
+        try:
+            #scanned/flattened PDFs have no AcroForm, skip walking their pages
+            #field names are keyed lowercase so lookups are case-insensitive
             form_fields = {}
-            for page in doc:
-                for widget in page.widgets():
-                    if widget.field_name and widget.field_value:
-                        form_fields[widget.field_name] = widget.field_value
-                        form_fields[widget.field_name.lower()] = widget.field_value
-            doc.close()
+            if doc.is_form_pdf:
+                form_fields = {
+                    widget.field_name.lower(): widget.field_value
+                    for page in doc
+                    for widget in page.widgets()
+                    if widget.field_name and widget.field_value
+                }
             
             if not form_fields:
                 return None, None
             
-            data = AttorneyData()
-            beneficiary = PassportData()
-            
             mappings = {
                 'last_name': ['Pt1Line2a_FamilyName[0]'],
                 'first_name': ['Pt1Line2b_GivenName[0]'],
@@ -78,20 +144,22 @@ class G28Extractor:
                 'law_firm_name': ['Pt2Line1d_NameofFirmOrOrganization[0]'],
             }
             
+            #collect values first and build the model once
+            attrs = {}
             for attr, field_names in mappings.items():
                 for name in field_names:
-                    for key in [name, name.lower()]:
-                        if key in form_fields:
-                            value = form_fields[key]
-                            if value and value.strip() and value.strip().upper() != 'N/A':
-                                setattr(data, attr, value.strip())
-                                break
+                    value = form_fields.get(name.lower())
+                    if value and (value := value.strip()) not in _SKIP_VALUES:
+                        attrs[attr] = value
+                        break
             
             #email in wrong field
-            if data.mobile_phone and '@' in data.mobile_phone:
-                if not data.email:
-                    data.email = data.mobile_phone
-                data.mobile_phone = None
+            mobile_phone = attrs.get('mobile_phone')
+            if mobile_phone and '@' in mobile_phone:
+                attrs.setdefault('email', mobile_phone)
+                del attrs['mobile_phone']
+            
+            data = AttorneyData(**attrs)
             
             beneficiary_mappings = {
                 'last_name': ['Pt3Line5a_FamilyName[0]'],
@@ -99,20 +167,19 @@ class G28Extractor:
                 'middle_name': ['Pt3Line5c_MiddleName[0]'],
             }
             
+            names = {}
             for attr, field_names in beneficiary_mappings.items():
                 for name in field_names:
-                    for key in [name, name.lower()]:
-                        if key in form_fields:
-                            value = form_fields[key]
-                            if value and value.strip() and value.strip().upper() != 'N/A':
-                                setattr(beneficiary, attr, value.strip())
-                                break
+                    value = form_fields.get(name.lower())
+                    if value and (value := value.strip()) not in _SKIP_VALUES:
+                        names[attr] = value
+                        break
             
-            if beneficiary.last_name or beneficiary.first_name:
-                beneficiary.extraction_method = "G28_BENEFICIARY"
-                beneficiary.confidence_score = 0.5
-            else:
-                beneficiary = None
+            beneficiary = None
+            if names.get('last_name') or names.get('first_name'):
+                beneficiary = PassportData(
+                    **names, extraction_method="G28_BENEFICIARY", confidence_score=0.5
+                )
             
             data.confidence_score = self._calculate_confidence(data)
             return data, beneficiary
@@ -121,87 +188,133 @@ class G28Extractor:
             logger.warning(f"PDF form field extraction failed: {e}")
             return None, None
     
-    def _get_images(self, file_path: Path, file_bytes: Optional[bytes] = None) -> list:
-        """Convert document to PIL Images."""
-        from PIL import Image
-        import io
+    async def _ocr_pipeline(self, pages_iter: Iterator[bytes]) -> str:
+        """Render, OCR and collect pages concurrently through bounded queues."""
+        render_q: asyncio.Queue = asyncio.Queue(maxsize=2)
+        text_q: asyncio.Queue = asyncio.Queue()
+        workers = OCR_CONCURRENCY
+        pages: dict[int, str] = {}
         
-        try:
-            if file_path.suffix.lower() == ".pdf":
-                from pdf2image import convert_from_path, convert_from_bytes
-                return convert_from_bytes(file_bytes, dpi=300) if file_bytes else convert_from_path(str(file_path), dpi=300)
-            else:
-                return [Image.open(io.BytesIO(file_bytes)) if file_bytes else Image.open(file_path)]
-        except Exception as e:
-            logger.error(f"Failed to load images: {e}")
-            return []
+        async def producer():
+            try:
+                page_number = 0
+                #a render in progress finishes before a cancel lands, the generator can then be closed
+                while (img_bytes := await _to_thread_settled(next, pages_iter, None)) is not None:
+                    page_number += 1
+                    await render_q.put((page_number, img_bytes))
+            except Exception as e:
+                logger.error(f"Failed to load images: {e}")
+            finally:
+                pages_iter.close()
+            #not on cancellation, the workers are being cancelled too and the queue may be full
+            for _ in range(workers):
+                await render_q.put(None)
+        
+        async def ocr_worker():
+            while (item := await render_q.get()) is not None:
+                page_number, img_bytes = item
+                await text_q.put((page_number, await self._ocr_image_async(img_bytes)))
+            await text_q.put(None)
+        
+        async def consumer():
+            finished = 0
+            while finished < workers:
+                item = await text_q.get()
+                if item is None:
+                    finished += 1
+                elif item[1]:
+                    pages[item[0]] = item[1]
+        
+        #return_exceptions makes a cancelled gather wait for every stage, so the producer's render
+        #settles before extract closes the document. the stages catch their own errors
+        await asyncio.gather(
+            producer(), *(ocr_worker() for _ in range(workers)), consumer(), return_exceptions=True
+        )
+        
+        #pages can finish out of order, keep document order for the regex pass
+        return "".join(pages[n] + "\n" for n in sorted(pages))
+    
+    def _extract_text_layer(self, doc) -> str:
+        """Embedded text of all pages, empty for image-only scans."""
+        return "\n".join(page.get_text("text") for page in doc)
+    
+    def _read_image(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Iterator[bytes]:
+        """Yield a raster upload as-is, tesseract decodes JPEG/PNG itself."""
+        yield file_bytes if file_bytes else file_path.read_bytes()
+    
+    def _render_pages_fitz(self, doc) -> Iterator[bytes]:
+        """Rasterize PDF pages in-process at 300 dpi with PyMuPDF."""
+        import fitz
+        matrix = fitz.Matrix(300 / 72, 300 / 72)
+        for page in doc:
+            yield page.get_pixmap(matrix=matrix, alpha=False).tobytes("png")
     
-    def _ocr_image(self, image) -> Optional[str]:
-        """Run OCR on image."""
+    async def _ocr_image_async(self, img_bytes: bytes) -> Optional[str]:
+        """Run OCR on an encoded image in a tesseract subprocess."""
         try:
-            import pytesseract
-            return pytesseract.image_to_string(image, config='--psm 3')
+            import aiopytesseract
+            async with _OCR_SLOTS:
+                return await aiopytesseract.image_to_string(img_bytes, psm=3, timeout=OCR_TIMEOUT_SECONDS)
         except Exception as e:
             logger.warning(f"OCR failed: {e}")
             return None
     
     def _extract_from_text(self, text: str) -> AttorneyData:
         """extract attorney data using pattern matching"""
-        data = AttorneyData()
+        fields = {}
         
         #name patterns
         name_patterns = [
-            (r'(?:Family\s*Name|Last\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']+)', 'last_name'),
-            (r'(?:Given\s*Name|First\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']+)', 'first_name'),
-            (r'(?:Middle\s*Name)[^A-Za-z]*([A-Za-z][A-Za-z\-\']*)', 'middle_name'),
+            (_RE_LAST, 'last_name'),
+            (_RE_FIRST, 'first_name'),
+            (_RE_MIDDLE, 'middle_name'),
         ]
         for pattern, field in name_patterns:
-            if not getattr(data, field):
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    value = match.group(1).strip()
-                    if value.lower() not in ('name', 'last', 'first', 'given', 'family', 'middle'):
-                        setattr(data, field, value.title())
+            match = pattern.search(text)
+            if match:
+                value = match.group(1).strip()
+                if value.lower() not in ('name', 'last', 'first', 'given', 'family', 'middle'):
+                    fields[field] = value.title()
         
         #address patterns
-        street_match = re.search(r'(?:Street|Address)[^A-Za-z0-9]*(\d+[^,\n]{5,50})', text, re.IGNORECASE)
+        street_match = _RE_STREET.search(text)
         if street_match:
-            data.street_address = re.sub(r'\s+', ' ', street_match.group(1).strip())[:100]
+            fields['street_address'] = _RE_WHITESPACE.sub(' ', street_match.group(1).strip())[:100]
         
-        city_match = re.search(r'(?:City|Town)[^A-Za-z]*([A-Z][A-Za-z\s]{2,30}?)(?:,|\s+[A-Z]{2}\s)', text)
+        city_match = _RE_CITY.search(text)
         if city_match:
-            data.city = re.sub(r'\s+[A-Z]{2}$', '', city_match.group(1).strip())
+            fields['city'] = _RE_CITY_STATE_SUFFIX.sub('', city_match.group(1).strip())
         
-        state_match = re.search(r'(?:State)[^A-Za-z]*([A-Z]{2})\b', text)
+        state_match = _RE_STATE.search(text)
         if state_match:
-            data.state = normalize_state(state_match.group(1))
+            fields['state'] = normalize_state(state_match.group(1))
         
-        zip_match = re.search(r'(?:ZIP|Postal)[^0-9]*(\d{5}(?:-\d{4})?)', text, re.IGNORECASE)
+        zip_match = _RE_ZIP.search(text)
         if zip_match:
-            data.zip_code = zip_match.group(1)
+            fields['zip_code'] = zip_match.group(1)
         
         #contact info
-        email_match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+        email_match = _RE_EMAIL.search(text)
         if email_match:
-            data.email = email_match.group(0).lower()
+            fields['email'] = email_match.group(0).lower()
         
         #professional info
-        bar_match = re.search(r'(?:Bar\s*Number)[^A-Za-z0-9]*([A-Z0-9]{4,12})', text, re.IGNORECASE)
+        bar_match = _RE_BAR.search(text)
         if bar_match:
-            data.bar_number = bar_match.group(1)
+            fields['bar_number'] = bar_match.group(1)
         
-        licensing_match = re.search(r'(?:Licensing\s*Authority)[^A-Za-z]*([A-Za-z][A-Za-z\s]+?)(?:,|\.)', text, re.IGNORECASE)
+        licensing_match = _RE_LICENSING.search(text)
         if licensing_match:
-            data.licensing_authority = licensing_match.group(1).strip().title()
+            fields['licensing_authority'] = licensing_match.group(1).strip().title()
         
-        firm_match = re.search(r'(?:Law\s*Firm|Organization)[^A-Za-z]*([A-Za-z][^,\n]{5,60})', text, re.IGNORECASE)
+        firm_match = _RE_FIRM.search(text)
         if firm_match:
-            data.law_firm_name = re.sub(r'\s+', ' ', firm_match.group(1).strip())
+            fields['law_firm_name'] = _RE_WHITESPACE.sub(' ', firm_match.group(1).strip())
         
-        if not data.country and data.state:
-            data.country = "United States"
+        if fields.get('state'):
+            fields['country'] = "United States"
         
-        return data
+        return AttorneyData(**fields)
     
     def _calculate_confidence(self, data: AttorneyData) -> float:
         """confidence score. check if extraction is successful (>0.3)"""
@@ -1,14 +1,21 @@
 """
 LLM-based passport extraction using OpenAI GPT-4
 """
+import asyncio
 import base64
-import json
+import hashlib
 import logging
 import os
+import threading
+from collections import OrderedDict
+from dataclasses import replace
 from pathlib import Path
 from typing import Optional
 from io import BytesIO
 
+import orjson
+from pydantic import TypeAdapter, ValidationError
+
 from models import PassportData
 
 logger = logging.getLogger(__name__)
@@ -36,54 +43,135 @@ Here are the instructions:
 3. Convert all dates to YYYY-MM-DD format
 4. Return ONLY valid JSON"""
 
+#cap on concurrent OpenAI requests, bursts beyond this queue instead of hitting rate limits
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+#results keyed by content digest, so re-uploads skip image prep and the API call
+RESULT_CACHE_SIZE = 64
+_result_cache: "OrderedDict[bytes, PassportData]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+_SEX_CODES = {"M": "M", "MALE": "M", "F": "F", "FEMALE": "F", "X": "X"}
+
+#the dataclass constructor doesn't type-check, the model's JSON is validated through this
+_passport_adapter = TypeAdapter(PassportData)
+
+
+def _cache_get(digest: bytes) -> Optional[PassportData]:
+    with _result_cache_lock:
+        result = _result_cache.get(digest)
+        if result is None:
+            return None
+        _result_cache.move_to_end(digest)
+    #shallow copies are independent, PassportData only holds immutable values
+    return replace(result)
+
+
+def _cache_put(digest: bytes, result: PassportData) -> None:
+    with _result_cache_lock:
+        _result_cache[digest] = replace(result)
+        _result_cache.move_to_end(digest)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
 
 class LLMPassportExtractor:
     """Extract passport data using OpenAI GPT-4o"""
     
     def __init__(self):
         self._client = None
+        self._slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._inflight: dict[bytes, asyncio.Task] = {}
+        self._waiters: dict[bytes, int] = {}
     
     @property
     def client(self):
+        """Lazy async client over a long-lived, pooled HTTP/2 connection."""
         if self._client is None:
             try:
-                from openai import OpenAI
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+                import httpx
                 api_key = os.getenv("OPENAI_API_KEY")
                 if api_key:
-                    self._client = OpenAI(api_key=api_key)
+                    self._client = AsyncOpenAI(
+                        api_key=api_key,
+                        http_client=DefaultAsyncHttpxClient(
+                            http2=True,
+                            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                        ),
+                    )
             except ImportError:
                 pass
         return self._client
     
-    def extract(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Optional[PassportData]:
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
+    async def extract(self, file_path: Path, file_bytes: Optional[bytes] = None) -> Optional[PassportData]:
         if not self.client:
             return None
         
-        image_base64, media_type = self._prepare_image(file_path, file_bytes)
+        if file_bytes is None:
+            file_bytes = await asyncio.to_thread(file_path.read_bytes)
+        digest = hashlib.blake2b(file_bytes, digest_size=16).digest()
+        cached = _cache_get(digest)
+        if cached:
+            return cached
+        
+        #identical uploads arriving together share one API call
+        task = self._inflight.get(digest)
+        if task is None:
+            task = asyncio.create_task(self._request(file_path, file_bytes, digest))
+            self._inflight[digest] = task
+            task.add_done_callback(lambda _: self._inflight.pop(digest, None))
+        
+        #shielded so one caller disconnecting doesn't cancel the others' request,
+        #the last one to give up cancels it so an abandoned upload doesn't pay for the call
+        self._waiters[digest] = self._waiters.get(digest, 0) + 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[digest] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[digest] -= 1
+            if not self._waiters[digest]:
+                del self._waiters[digest]
+        return replace(result) if result else None
+    
+    async def _request(self, file_path: Path, file_bytes: bytes, digest: bytes) -> Optional[PassportData]:
+        """Prepare the image and run one GPT-4o extraction."""
+        image_base64, media_type = await asyncio.to_thread(self._prepare_image, file_path, file_bytes)
         if not image_base64:
             return None
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": EXTRACTION_PROMPT},
-                        {"type": "image_url", "image_url": {
-                            "url": f"data:{media_type};base64,{image_base64}",
-                            "detail": "high"
-                        }}
-                    ]
-                }],
-                max_tokens=1000,
-                temperature=0
-            )
+            async with self._slots:
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": EXTRACTION_PROMPT},
+                            {"type": "image_url", "image_url": {
+                                "url": f"data:{media_type};base64,{image_base64}",
+                                "detail": "high"
+                            }}
+                        ]
+                    }],
+                    max_tokens=1000,
+                    temperature=0
+                )
             
             result = self._parse_response(response.choices[0].message.content)
             if result:
                 result.extraction_method = "LLM_OPENAI"
                 result.confidence_score = 0.95
+                _cache_put(digest, result)
             return result
             
         except Exception as e:
@@ -109,14 +197,12 @@ class LLMPassportExtractor:
             if img.mode in ('RGBA', 'P'):
                 img = img.convert('RGB')
             
-            #resize if too large
-            max_size = 2000
-            if max(img.size) > max_size:
-                ratio = max_size / max(img.size)
-                img = img.resize((int(img.size[0] * ratio), int(img.size[1] * ratio)), Image.LANCZOS)
+            #downscale in place if too large, 1600px is plenty for the model to read
+            max_size = 1600
+            img.thumbnail((max_size, max_size), Image.LANCZOS)
             
             buffer = BytesIO()
-            img.save(buffer, format="JPEG", quality=95)
+            img.save(buffer, format="JPEG", quality=85, optimize=True, progressive=True)
             return base64.b64encode(buffer.getvalue()).decode(), "image/jpeg"
             
         except Exception as e:
@@ -132,9 +218,9 @@ class LLMPassportExtractor:
             elif "```" in json_str:
                 json_str = json_str.split("```")[1].split("```")[0]
             
-            data = json.loads(json_str)
+            data = orjson.loads(json_str)
             
-            return PassportData(
+            return _passport_adapter.validate_python(dict(
                 last_name=data.get("last_name"),
                 first_name=data.get("first_name"),
                 middle_name=data.get("middle_name"),
@@ -143,11 +229,11 @@ class LLMPassportExtractor:
                 nationality=data.get("nationality"),
                 date_of_birth=data.get("date_of_birth"),
                 place_of_birth=data.get("place_of_birth"),
-                sex=data.get("sex"),
+                sex=_SEX_CODES.get(str(data.get("sex") or "").strip().upper()),
                 date_of_issue=data.get("date_of_issue"),
                 date_of_expiration=data.get("date_of_expiration"),
-            )
-        except (json.JSONDecodeError, KeyError) as e:
+            ))
+        except (orjson.JSONDecodeError, KeyError, ValidationError) as e:
             logger.error(f"Failed to parse LLM response: {e}")
             return None
 
@@ -1,17 +1,43 @@
 """
-Passport data extraction using LLM vision first, then MRZ parsing (if LLM fails), and OCR fallback (if both fail).
+Passport data extraction with LLM vision, MRZ parsing and OCR run concurrently.
+The first confident result wins, otherwise the best of whatever succeeded.
 """
+import asyncio
+import os
+import queue
 import re
+import threading
+from contextlib import contextmanager
+from dataclasses import fields, replace
+from functools import lru_cache
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Iterator, Optional, Tuple
 from datetime import datetime
 import logging
 
-from models import PassportData
+from models import PassportData, normalize_date
 
 logger = logging.getLogger(__name__)
 
-COUNTRY_CODES = {
+#single-threaded tesseract is faster per page, and pages are already OCR'd in parallel by _OCR_POOL.
+#read by tesseract's OpenMP runtime when tesserocr is first imported
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+#a strategy at or above this confidence ends the race, lower ones wait for the rest
+CONFIDENT_SCORE = 0.9
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))
+#how long a confident MRZ result waits for the LLM's names, countries and the fields the MRZ doesn't carry
+LLM_GRACE_SECONDS = float(os.getenv("LLM_GRACE_SECONDS", "5"))
+#fields covered by MRZ check digits, kept over the LLM's reading
+_MRZ_VERIFIED_FIELDS = ("passport_number", "date_of_birth", "date_of_expiration", "sex")
+
+_MRZ_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<"
+#the MRZ sits in the bottom quarter of the data page, OCR that band before the whole page
+_MRZ_BAND_TOP = 0.72
+
+COUNTRY_CODES = MappingProxyType({
     "USA": "United States", "GBR": "United Kingdom", "CAN": "Canada",
     "AUS": "Australia", "DEU": "Germany", "FRA": "France", "ITA": "Italy",
     "ESP": "Spain", "JPN": "Japan", "CHN": "China", "IND": "India",
@@ -26,135 +52,383 @@ COUNTRY_CODES = {
     "ZAF": "South Africa", "EGY": "Egypt", "NGA": "Nigeria", "KEN": "Kenya",
     "ISR": "Israel", "ARE": "United Arab Emirates", "SAU": "Saudi Arabia",
     "TUR": "Turkey", "PAK": "Pakistan", "BGD": "Bangladesh",
-}
+})
+
+#compiled once at import, these run on every OCR'd page
+_MRZ_CLEAN_RE = re.compile(r'[^A-Z0-9<]')
+#passport document type and a letters-only issuing state, the line-1 checks TD3CodeChecker used to make
+_TD3_HEADER_RE = re.compile(r'P[A-Z<][A-Z<]{3}')
+_TD3_COUNTRY_RE = re.compile(r'[A-Z<]{3}')
+_PASSPORT_NUM_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:passport\s*(?:no|number|#)?[:\s]*)([A-Z0-9]{6,12})',
+    r'\b([A-Z]{1,2}\d{6,9})\b',
+    r'\b(\d{9})\b',
+))
+_DOB_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:date\s+of\s+birth|dob|birth\s*date)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
+    r'(?:date\s+of\s+birth|dob|birth\s*date)[:\s]*(\d{1,2}\s+[A-Za-z]+\s+\d{2,4})',
+))
+_SEX_RE = re.compile(r'(?:sex|gender)[:\s]*(M|F|MALE|FEMALE|X)', re.IGNORECASE)
+#names from the first TD3 line, e.g. P<USADOE<<JOHN<PAUL<<<
+_MRZ_NAMES_RE = re.compile(r'P[A-Z<][A-Z<]{3}([A-Z]+(?:<[A-Z]+)*)<<([A-Z]+(?:<[A-Z]+)*)')
+
+#ICAO 9303 check digits: 0-9 as is, A-Z as 10-35, filler as 0, weighted 7,3,1 repeating
+_MRZ_CHAR_VALUES = {c: i for i, c in enumerate('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')}
+_MRZ_CHAR_VALUES['<'] = 0
+_MRZ_WEIGHTS = (7, 3, 1) * 15
+
+#century pivot for YYMMDD dates, fixed at import since it only shifts at new year
+_CURRENT_YY = datetime.now().year % 100
+_TWO = tuple(f'{i:02d}' for i in range(100))
+
+def _otsu_threshold(histogram: list) -> int:
+    """Gray level that best separates a 256-bin histogram into ink and paper (Otsu's method)."""
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    weight_bg = sum_bg = 0
+    best_variance, threshold = 0.0, 127
+    for t, count in enumerate(histogram):
+        weight_bg += count
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += t * count
+        mean_diff = sum_bg / weight_bg - (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * mean_diff * mean_diff
+        if variance > best_variance:
+            best_variance, threshold = variance, t
+    return threshold
+
+
+@lru_cache(maxsize=1)
+def _load_nlp():
+    """spaCy model shared by all extractors, only NER is used so the other components are skipped."""
+    try:
+        import spacy
+        return spacy.load("en_core_web_sm", disable=["parser", "tagger", "lemmatizer"])
+    except (ImportError, OSError):
+        return None
+
+
+def _mrz_check_digit(field: str) -> int:
+    return sum(_MRZ_CHAR_VALUES[c] * w for c, w in zip(field, _MRZ_WEIGHTS)) % 10
+
+
+class _LazyPages:
+    """Sequence of pages rendered on first access and cached, safe to share between threads."""
+    
+    def __init__(self, count: int, render: Optional[Callable], close: Optional[Callable] = None):
+        self._render = render
+        self._close = close
+        self._pages = [None] * count
+        #PyMuPDF documents aren't thread-safe, so rendering is serialized too
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._pages)
+    
+    def __getitem__(self, index: int):
+        with self._lock:
+            page = self._pages[index]
+            if page is None:
+                if self._render is None:
+                    raise ValueError("pages are closed")
+                page = self._pages[index] = self._render(index)
+            return page
+    
+    def close(self) -> None:
+        """Release the source document, after any render in progress. Rendered pages stay readable."""
+        with self._lock:
+            self._render = None
+            if self._close is not None:
+                self._close()
+                self._close = None
+
+
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", os.cpu_count() or 1))
+#tesserocr releases the GIL while recognizing, so threads are enough to OCR pages in parallel
+_OCR_POOL = ThreadPoolExecutor(max_workers=OCR_CONCURRENCY, thread_name_prefix="passport-ocr")
 
 
 class PassportExtractor:
     """Multi-strategy passport data extractor."""
     
-    def __init__(self):
-        self._nlp = None
+    def __init__(self, omp_threads: Optional[int] = None):
+        self._llm = None
+        #background closes of PDF documents, referenced until they finish
+        self._closing: set[asyncio.Task] = set()
+        #idle tesserocr handles per mode (mrz=True/False), and slots capping each mode at OCR_CONCURRENCY in use
+        self._tess_pools = {True: queue.SimpleQueue(), False: queue.SimpleQueue()}
+        self._tess_slots = {mrz: threading.BoundedSemaphore(OCR_CONCURRENCY) for mrz in (True, False)}
+        #let tesseract use more threads, only worth it without outer page parallelism
+        if omp_threads:
+            os.environ["OMP_THREAD_LIMIT"] = str(omp_threads)
     
     @property
     def nlp(self):
         """Lazy load spaCy model."""
-        if self._nlp is None:
+        return _load_nlp()
+    
+    @property
+    def llm(self):
+        """Shared LLM extractor, so its HTTP connections are reused across calls."""
+        if self._llm is None:
+            from extractors.llm_passport_extractor import LLMPassportExtractor
+            self._llm = LLMPassportExtractor()
+        return self._llm
+    
+    def _new_tess_api(self, mrz: bool):
+        from tesserocr import PyTessBaseAPI, PSM
+        if mrz:
+            api = PyTessBaseAPI(lang="eng", psm=PSM.SINGLE_BLOCK)
+            api.SetVariable("tessedit_char_whitelist", _MRZ_WHITELIST)
+            return api
+        return PyTessBaseAPI(lang="eng", psm=PSM.AUTO)
+    
+    @contextmanager
+    def _tess_api(self, mrz: bool):
+        """Borrow a tesserocr handle, a PyTessBaseAPI can't be used by two threads at once.
+        At most OCR_CONCURRENCY are in use at once, so no more than that are ever created."""
+        pool, slots = self._tess_pools[mrz], self._tess_slots[mrz]
+        with slots:
             try:
-                import spacy
-                self._nlp = spacy.load("en_core_web_sm")
-            except OSError:
-                self._nlp = False
-        return self._nlp if self._nlp else None
-    
-    def extract(self, file_path: Path, file_bytes: Optional[bytes] = None, use_llm: bool = True) -> PassportData:
-        """Extract passport data using available methods."""
-        # using LLM extraction first
-        if use_llm:
+                api = pool.get_nowait()
+            except queue.Empty:
+                api = self._new_tess_api(mrz)
             try:
-                from extractors.llm_passport_extractor import LLMPassportExtractor, is_llm_available
-                if is_llm_available():
-                    llm_extractor = LLMPassportExtractor()
-                    result = llm_extractor.extract(file_path, file_bytes)
-                    if result and (result.passport_number or result.last_name):
-                        return result
-            except Exception as e:
-                logger.warning(f"LLM extraction failed: {e}")
-        
-        images = self._get_images(file_path, file_bytes)
-        
-        # use MRZ extraction if LLM fails
-        mrz_data = self._extract_mrz(images)
-        if mrz_data and mrz_data.passport_number:
-            mrz_data.extraction_method = "MRZ"
-            mrz_data.confidence_score = 0.95
-            return mrz_data
-        
-        # use OCR and NLP if both llm and mrz fail
-        ocr_data = self._extract_via_ocr(images)
-        if ocr_data:
-            ocr_data.extraction_method = "OCR+NLP"
-            ocr_data.confidence_score = 0.7
-            return ocr_data
-        
-        return PassportData(extraction_method="FAILED", confidence_score=0.0)
-    
-    def _get_images(self, file_path: Path, file_bytes: Optional[bytes] = None) -> list:
-        """convert document to PIL Images."""
-        from PIL import Image
-        import io
-        
-        images = []
-        suffix = file_path.suffix.lower()
+                yield api
+            finally:
+                pool.put(api)
+    
+    def close(self) -> None:
+        """Free the idle tesseract engines."""
+        for pool in self._tess_pools.values():
+            while True:
+                try:
+                    pool.get_nowait().End()
+                except queue.Empty:
+                    break
+    
+    def __del__(self):
+        self.close()
+    
+    async def aclose(self) -> None:
+        """Release the LLM client's connections and the tesseract engines."""
+        if self._llm is not None:
+            await self._llm.aclose()
+        if self._closing:
+            await asyncio.gather(*self._closing)
+        self.close()
+    
+    async def extract(self, file_path: Path, file_bytes: Optional[bytes] = None, use_llm: bool = True) -> PassportData:
+        """Run LLM, MRZ and OCR extraction concurrently, returning the first confident result or else the best one."""
+        stop = threading.Event()
+        pages = asyncio.create_task(asyncio.to_thread(self._load_images, file_path, file_bytes))
+        strategies = [
+            asyncio.create_task(self._run_local(pages, self._extract_mrz, stop)),
+            asyncio.create_task(self._run_local(pages, self._extract_via_ocr, stop)),
+        ]
+        llm = None
+        if use_llm:
+            from extractors.llm_passport_extractor import is_llm_available
+            if is_llm_available():
+                llm = asyncio.create_task(self._extract_llm(file_path, file_bytes))
+                strategies.append(llm)
         
+        best = None
         try:
-            if suffix == ".pdf":
-                from pdf2image import convert_from_path, convert_from_bytes
-                images = convert_from_bytes(file_bytes, dpi=300) if file_bytes else convert_from_path(str(file_path), dpi=300)
-            else:
-                images = [Image.open(io.BytesIO(file_bytes)) if file_bytes else Image.open(file_path)]
-        except Exception as e:
-            logger.error(f"Failed to load images: {e}")
+            for next_done in asyncio.as_completed(strategies):
+                try:
+                    result = await next_done
+                except Exception as e:
+                    logger.warning(f"Passport extraction strategy failed: {e}")
+                    continue
+                if result is None:
+                    continue
+                if result.confidence_score >= CONFIDENT_SCORE:
+                    return await self._merge_llm(result, llm)
+                if best is None or result.confidence_score > best.confidence_score:
+                    best = result
+        finally:
+            #stop the local OCR between pages and drop whatever is still running
+            stop.set()
+            for task in strategies:
+                task.cancel()
+            #in the background, a cancelled strategy's thread may still be rendering a page
+            closing = asyncio.create_task(self._close_pages(pages))
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
         
-        return images
+        return best or PassportData(extraction_method="FAILED", confidence_score=0.0)
+    
+    async def _merge_llm(self, result: PassportData, llm: Optional[asyncio.Task]) -> PassportData:
+        """Combine a confident local result with the LLM's, waiting up to LLM_GRACE_SECONDS for it.
+        Check-digit-verified fields come from the MRZ, everything else from the LLM where it has a value."""
+        if llm is None:
+            return result
+        if not llm.done():
+            await asyncio.wait({llm}, timeout=LLM_GRACE_SECONDS)
+            if not llm.done():
+                return result
+        extra = llm.result()
+        if extra is None or extra is result:
+            return result
+        #names keep their diacritics and countries their full names, the MRZ only fills gaps
+        merged = {
+            f.name: getattr(result, f.name) for f in fields(extra)
+            if getattr(extra, f.name) is None and getattr(result, f.name) is not None
+        }
+        for name in _MRZ_VERIFIED_FIELDS:
+            if getattr(result, name) is not None:
+                merged[name] = getattr(result, name)
+        return replace(
+            extra, **merged,
+            extraction_method=f"{result.extraction_method}+LLM", confidence_score=result.confidence_score,
+        )
     
-    def _extract_mrz(self, images: list) -> Optional[PassportData]:
-        """Extract data from MRZ using mrz library."""
+    async def _extract_llm(self, file_path: Path, file_bytes: Optional[bytes]) -> Optional[PassportData]:
+        """LLM extraction, given up on after LLM_DEADLINE_SECONDS."""
         try:
-            from mrz.checker.td3 import TD3CodeChecker
-        except ImportError:
+            result = await asyncio.wait_for(self.llm.extract(file_path, file_bytes), LLM_DEADLINE_SECONDS)
+        except Exception as e:
+            logger.warning(f"LLM extraction failed: {e!r}")
             return None
+        return result if result and (result.passport_number or result.last_name) else None
+    
+    async def _close_pages(self, pages: asyncio.Task) -> None:
+        """Close the loaded document once no page is being rendered from it."""
+        images = await pages
+        await asyncio.to_thread(images.close)
+    
+    async def _run_local(self, pages: asyncio.Task, strategy: Callable, stop: threading.Event) -> Optional[PassportData]:
+        """Run a CPU-bound strategy off the event loop once the shared pages are loaded."""
+        #shielded so cancelling one strategy doesn't cancel page loading for the other
+        images = await asyncio.shield(pages)
+        return await asyncio.to_thread(strategy, images, stop)
+    
+    def _load_images(self, file_path: Path, file_bytes: Optional[bytes] = None):
+        """Document pages, rendered and binarized only when a strategy first reads them."""
+        from PIL import Image
+        import io
         
-        for img in images:
-            text = self._ocr_image(img)
-            if not text:
+        try:
+            if file_path.suffix.lower() == ".pdf":
+                import fitz
+                doc = fitz.open(stream=file_bytes, filetype="pdf") if file_bytes else fitz.open(str(file_path))
+                #render at 300 dpi straight to grayscale, pages are binarized anyway
+                matrix = fitz.Matrix(300 / 72, 300 / 72)
+                
+                def render(index: int):
+                    pix = doc[index].get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+                    return self._preprocess(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+                
+                return _LazyPages(doc.page_count, render, doc.close)
+            
+            img = Image.open(io.BytesIO(file_bytes)) if file_bytes else Image.open(file_path)
+            return _LazyPages(1, lambda _: self._preprocess(img))
+        except Exception as e:
+            logger.error(f"Failed to load images: {e}")
+            return _LazyPages(0, None)
+    
+    def _preprocess(self, image):
+        """Grayscale and Otsu-threshold a page, tesseract reads clean black and white faster."""
+        gray = image.convert('L')
+        threshold = _otsu_threshold(gray.histogram())
+        return gray.point(lambda p: 255 if p > threshold else 0)
+    
+    def _extract_mrz(self, images, stop: Optional[threading.Event] = None) -> Optional[PassportData]:
+        """Extract data from an MRZ that passes the TD3 passport checks."""
+        for mrz_lines in self._ocr_pages(images, self._ocr_mrz_lines, stop):
+            if not mrz_lines or not self._td3_checks_pass(*mrz_lines):
                 continue
             
-            mrz_lines = self._find_mrz_lines(text)
-            if mrz_lines:
-                try:
-                    checker = TD3CodeChecker(mrz_lines[0] + "\n" + mrz_lines[1])
-                    if checker.result:
-                        return self._parse_mrz_fields(checker.fields())
-                except:
-                    pass
+            data = self._parse_mrz_fields(self._td3_fields(*mrz_lines))
+            if data.passport_number:
+                data.extraction_method = "MRZ"
+                data.confidence_score = 0.95
+                return data
         
         return None
     
+    def _td3_checks_pass(self, line1: str, line2: str) -> bool:
+        """Verify the passport header and nationality, then the document number, birth date,
+        expiry, personal number and composite check digits."""
+        if not _TD3_HEADER_RE.match(line1) or not _TD3_COUNTRY_RE.fullmatch(line2[10:13]):
+            return False
+        checks = (
+            (line2[0:9], line2[9]),
+            (line2[13:19], line2[19]),
+            (line2[21:27], line2[27]),
+            (line2[28:42], line2[42]),
+            (line2[0:10] + line2[13:20] + line2[21:43], line2[43]),
+        )
+        return all(_mrz_check_digit(field) == _MRZ_CHAR_VALUES[check] for field, check in checks)
+    
+    def _td3_fields(self, line1: str, line2: str) -> dict:
+        """Slice the TD3 passport layout into named fields."""
+        surname, _, name = line1[5:44].partition('<<')
+        sex = line2[20]
+        return {
+            'surname': surname,
+            'name': name,
+            'country': line1[2:5].replace('<', ''),
+            'document_number': line2[0:9],
+            'nationality': line2[10:13].replace('<', ''),
+            'birth_date': line2[13:19],
+            'sex': sex if sex in ('M', 'F', 'X') else '',
+            'expiry_date': line2[21:27],
+        }
+    
+    def _ocr_mrz_lines(self, image) -> Optional[Tuple[str, str]]:
+        """OCR the MRZ band for the two MRZ lines, falling back to the full page."""
+        for candidate in (self._mrz_band(image), image):
+            text = self._ocr_image(candidate)
+            mrz_lines = self._find_mrz_lines(text) if text else None
+            if mrz_lines:
+                return mrz_lines
+        return None
+    
+    def _mrz_band(self, image):
+        """Bottom strip of a preprocessed page."""
+        w, h = image.size
+        return image.crop((0, int(h * _MRZ_BAND_TOP), w, h))
+    
     def _find_mrz_lines(self, text: str) -> Optional[Tuple[str, str]]:
         """Find MRZ lines in OCR text."""
-        lines = text.upper().split('\n')
-        mrz_pattern = re.compile(r'^[A-Z0-9<]{40,50}$')
-        
         candidates = []
-        for line in lines:
-            cleaned = line.replace(' ', '').replace('«', '<').replace('‹', '<')
-            cleaned = re.sub(r'[^A-Z0-9<]', '', cleaned)
+        for line in text.split('\n'):
+            #cleanup only removes characters, so shorter lines can never be an MRZ row.
+            #most lines stop here, before any per-character work
+            if len(line) < 42:
+                continue
+            #spaces are dropped by _MRZ_CLEAN_RE along with other non-MRZ characters
+            cleaned = _MRZ_CLEAN_RE.sub('', line.upper().replace('«', '<').replace('‹', '<'))
             
-            if mrz_pattern.match(cleaned) and 42 <= len(cleaned) <= 46:
-                if len(cleaned) < 44:
-                    cleaned += '<' * (44 - len(cleaned))
-                elif len(cleaned) > 44:
-                    cleaned = cleaned[:44]
-                candidates.append(cleaned)
+            #only MRZ characters are left, so the length alone decides
+            if 42 <= len(cleaned) <= 46:
+                candidates.append(cleaned.ljust(44, '<')[:44])
+                if len(candidates) == 2:
+                    return candidates[0], candidates[1]
         
-        return (candidates[0], candidates[1]) if len(candidates) >= 2 else None
+        return None
     
     def _parse_mrz_fields(self, fields: dict) -> PassportData:
         """parse MRZ fields into PassportData."""
-        surname = fields.get('surname', '').replace('<', ' ').strip()
-        given_names = fields.get('name', '').replace('<', ' ').strip()
-        
-        name_parts = given_names.split()
-        first_name = name_parts[0] if name_parts else None
-        middle_name = ' '.join(name_parts[1:]) if len(name_parts) > 1 else None
+        surname = fields.get('surname', '').replace('<', ' ').strip().title()
+        #title-case all given names in one pass, then split off first and middle
+        name_parts = fields.get('name', '').replace('<', ' ').title().split()
+        country = fields.get('country', '')
+        nationality = fields.get('nationality', '')
         
         return PassportData(
-            last_name=surname.title() if surname else None,
-            first_name=first_name.title() if first_name else None,
-            middle_name=middle_name.title() if middle_name else None,
+            last_name=surname or None,
+            first_name=name_parts[0] if name_parts else None,
+            middle_name=' '.join(name_parts[1:]) or None,
             passport_number=fields.get('document_number', '').replace('<', ''),
-            country_of_issue=COUNTRY_CODES.get(fields.get('country', ''), fields.get('country', '')),
-            nationality=COUNTRY_CODES.get(fields.get('nationality', ''), fields.get('nationality', '')),
+            country_of_issue=COUNTRY_CODES.get(country, country),
+            nationality=COUNTRY_CODES.get(nationality, nationality),
             date_of_birth=self._parse_mrz_date(fields.get('birth_date', '')),
             sex=fields.get('sex', '').upper() or None,
             date_of_expiration=self._parse_mrz_date(fields.get('expiry_date', '')),
@@ -164,60 +438,111 @@ class PassportExtractor:
         """parse MRZ date (YYMMDD) to ISO format."""
         if not date_str or len(date_str) < 6:
             return None
-        try:
-            yy, mm, dd = int(date_str[:2]), int(date_str[2:4]), int(date_str[4:6])
-            current_year = datetime.now().year % 100
-            year = 1900 + yy if yy > current_year + 10 else 2000 + yy
-            return f"{year:04d}-{mm:02d}-{dd:02d}"
-        except:
+        digits = date_str[:6]
+        if not (digits.isascii() and digits.isdigit()):
+            return None
+        yy = (ord(digits[0]) - 48) * 10 + ord(digits[1]) - 48
+        mm = (ord(digits[2]) - 48) * 10 + ord(digits[3]) - 48
+        dd = (ord(digits[4]) - 48) * 10 + ord(digits[5]) - 48
+        if not (1 <= mm <= 12 and 1 <= dd <= 31):
             return None
+        century = '19' if yy > _CURRENT_YY + 10 else '20'
+        return century + _TWO[yy] + '-' + _TWO[mm] + '-' + _TWO[dd]
+    
+    def _ocr_pages(self, images, ocr: Callable, stop: Optional[threading.Event] = None) -> Iterator[Optional[str]]:
+        """OCR page 1, then the remaining pages concurrently, yielding texts as they finish.
+        Pages the caller never gets to are neither rendered nor OCR'd."""
+        def run(index: int):
+            return None if stop is not None and stop.is_set() else ocr(images[index])
+        
+        if not len(images):
+            return
+        #the data page is almost always first, don't render the rest unless it fails
+        yield run(0)
+        
+        rest = range(1, len(images))
+        if len(rest) <= 1:
+            for index in rest:
+                yield run(index)
+            return
+        
+        futures = [_OCR_POOL.submit(run, index) for index in rest]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
     
     def _ocr_image(self, image) -> Optional[str]:
         """Run OCR on image."""
         try:
-            import pytesseract
-            return pytesseract.image_to_string(
-                image, config='--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<'
-            )
+            with self._tess_api(mrz=True) as api:
+                api.SetImage(image)
+                return api.GetUTF8Text()
         except Exception as e:
             logger.warning(f"OCR failed: {e}")
             return None
     
-    def _extract_via_ocr(self, images: list) -> Optional[PassportData]:
+    def _extract_via_ocr(self, images, stop: Optional[threading.Event] = None) -> Optional[PassportData]:
         """OCR extraction"""
         try:
-            import pytesseract
+            import tesserocr
         except ImportError:
             return None
         
-        for img in images:
+        def ocr_page(img) -> Optional[str]:
             try:
-                text = pytesseract.image_to_string(img, config='--psm 3')
-                if text and len(text) >= 50:
-                    data = self._extract_from_text(text)
-                    if data.passport_number or data.last_name:
-                        return data
+                with self._tess_api(mrz=False) as api:
+                    api.SetImage(img)
+                    return api.GetUTF8Text()
             except:
-                pass
+                return None
+        
+        for text in self._ocr_pages(images, ocr_page, stop):
+            if text and len(text) >= 50:
+                data = self._extract_from_text(text)
+                if data.passport_number or data.last_name:
+                    data.extraction_method = "OCR+NLP"
+                    data.confidence_score = 0.7
+                    return data
         return None
     
     def _extract_from_text(self, text: str) -> PassportData:
         """extract passport fields from text using NERs and regex."""
         data = PassportData()
         
-        for pattern in [
-            r'(?:passport\s*(?:no|number|#)?[:\s]*)([A-Z0-9]{6,12})',
-            r'\b([A-Z]{1,2}\d{6,9})\b',
-            r'\b(\d{9})\b',
-        ]:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for rx in _PASSPORT_NUM_RES:
+            match = rx.search(text)
             if match:
                 data.passport_number = match.group(1).upper()
                 break
         
-        #NERs
-        if self.nlp:
-            doc = self.nlp(text[:2000])
+        for rx in _DOB_RES:
+            match = rx.search(text)
+            if match:
+                data.date_of_birth = normalize_date(match.group(1))
+                break
+        
+        sex_match = _SEX_RE.search(text)
+        if sex_match:
+            sex = sex_match.group(1).upper()
+            data.sex = 'M' if sex in ('M', 'MALE') else 'F' if sex in ('F', 'FEMALE') else 'X'
+        
+        #an MRZ name line is enough, no need to run NER over the page
+        if '<<' in text:
+            match = _MRZ_NAMES_RE.search(text.upper().replace(' ', ''))
+            if match:
+                given_names = match.group(2).replace('<', ' ').title().split()
+                data.last_name = match.group(1).replace('<', ' ').title()
+                data.first_name = given_names[0]
+                data.middle_name = ' '.join(given_names[1:]) or None
+                return data
+        
+        #NERs, identifying fields are near the top of the page
+        nlp = self.nlp
+        if nlp:
+            doc = nlp(text[:800])
             persons = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
             if persons:
                 parts = persons[0].split()
@@ -227,27 +552,4 @@ class PassportExtractor:
                     if len(parts) > 2:
                         data.middle_name = ' '.join(parts[1:-1])
         
-        for pattern in [
-            r'(?:date\s+of\s+birth|dob|birth\s*date)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-            r'(?:date\s+of\s+birth|dob|birth\s*date)[:\s]*(\d{1,2}\s+[A-Za-z]+\s+\d{2,4})',
-        ]:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data.date_of_birth = self._normalize_date(match.group(1))
-                break
-        
-        sex_match = re.search(r'(?:sex|gender)[:\s]*(M|F|MALE|FEMALE|X)', text, re.IGNORECASE)
-        if sex_match:
-            sex = sex_match.group(1).upper()
-            data.sex = 'M' if sex in ('M', 'MALE') else 'F' if sex in ('F', 'FEMALE') else 'X'
-        
         return data
-    
-    def _normalize_date(self, date_str: str) -> Optional[str]:
-        """Normalize date to ISO format."""
-        try:
-            import dateparser
-            parsed = dateparser.parse(date_str)
-            return parsed.strftime("%Y-%m-%d") if parsed else date_str
-        except:
-            return date_str
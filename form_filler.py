@@ -1,16 +1,18 @@
 """
 Browser automation for form filling using Playwright.
 """
+import asyncio
 import logging
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
+from types import MappingProxyType
 
-from models import ExtractedFormData, PassportData, AttorneyData
+from models import ExtractedFormData, PassportData, AttorneyData, normalize_date
 
 logger = logging.getLogger(__name__)
 
-STATE_CODES = {
+STATE_CODES = MappingProxyType({
     'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR',
     'california': 'CA', 'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE',
     'district of columbia': 'DC', 'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI',
@@ -24,16 +26,84 @@ STATE_CODES = {
     'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX',
     'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
     'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY'
-}
+})
+_VALID_CODES = frozenset(STATE_CODES.values())
+
+#forms filled at once by batch_fill, each holds its own browser context and page
+BATCH_CONCURRENCY = 4
+
+#selector -> value, or a list of values for selectors that match several inputs.
+#empty values and unknown select options are skipped, like the per-field fills were
+_FILL_FIELDS_JS = """(fields) => {
+    for (const [selector, value] of Object.entries(fields)) {
+        const values = Array.isArray(value) ? value : [value];
+        const elements = document.querySelectorAll(selector);
+        values.forEach((val, i) => {
+            const el = elements[i];
+            if (!el || val == null || val === '') return;
+            if (el.tagName === 'SELECT' && ![...el.options].some(o => o.value === val)) return;
+            //native setter, so frameworks tracking the value property see the change
+            Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set.call(el, val);
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+        });
+    }
+}"""
 
 
 class FormFiller:
-    """Playwright-based form filler for legal documentation forms."""
+    """Playwright-based form filler for legal documentation forms.
+    
+    Use as an async context manager to keep one browser open across several forms.
+    """
     
     def __init__(self, headless: bool = False):
         self.headless = headless
         self.screenshot_dir = Path(__file__).parent / "screenshots"
         self.screenshot_dir.mkdir(exist_ok=True)
+        self._playwright = None
+        self._browser = None
+    
+    async def __aenter__(self) -> "FormFiller":
+        from playwright.async_api import async_playwright
+        
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        """Shut down the browser and Playwright."""
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+    
+    @classmethod
+    async def batch_fill(
+        cls,
+        datas: list[ExtractedFormData],
+        target_url: str = "https://mendrika-alma.github.io/form-submission/",
+        headless: bool = True,
+        concurrency: int = BATCH_CONCURRENCY,
+    ) -> list[Optional[str]]:
+        """Fill one form per data set with a single browser launch, returning screenshot paths.
+        At most `concurrency` forms are open at once. A form that fails gets None without stopping the others.
+        Runs headless by default, unlike FormFiller, since a visible browser keeps each form open for 60 s."""
+        slots = asyncio.Semaphore(concurrency)
+        
+        async def fill(filler: "FormFiller", data: ExtractedFormData) -> Optional[str]:
+            async with slots:
+                return await filler.fill_form(data, target_url)
+        
+        async with cls(headless=headless) as filler:
+            #keep the browser open until every form has finished, failed or not
+            results = await asyncio.gather(*(fill(filler, data) for data in datas), return_exceptions=True)
+        return [None if isinstance(result, BaseException) else result for result in results]
     
     async def fill_form(
         self, 
@@ -41,139 +111,99 @@ class FormFiller:
         target_url: str = "https://mendrika-alma.github.io/form-submission/"
     ) -> Optional[str]:
         """Fill the target form with extracted data and return screenshot path."""
-        from playwright.async_api import async_playwright
+        if self._browser is None:
+            #not entered as a context manager, launch a browser just for this form
+            async with self:
+                return await self.fill_form(data, target_url)
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(viewport={"width": 1280, "height": 1024})
-            page = await context.new_page()
+        #fresh context per form so cookies and storage don't leak between forms
+        context = await self._browser.new_context(viewport={"width": 1280, "height": 1024})
+        page = await context.new_page()
+        
+        try:
+            await page.goto(target_url, wait_until="networkidle")
+            await page.wait_for_selector('#family-name')
+            
+            if data.attorney:
+                await self._fill_attorney_section(page, data.attorney)
+                await self._fill_eligibility_section(page, data.attorney)
+            
+            if data.passport:
+                await self._fill_passport_section(page, data.passport)
+            
+            #microseconds keep screenshots from a batch from overwriting each other
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            screenshot_path = self.screenshot_dir / f"form_filled_{timestamp}.png"
+            await page.screenshot(path=str(screenshot_path), full_page=True)
+            
+            if not self.headless:
+                await page.wait_for_timeout(60000)
             
-            try:
-                await page.goto(target_url, wait_until="networkidle")
-                await page.wait_for_timeout(1000)
-                
-                if data.attorney:
-                    await self._fill_attorney_section(page, data.attorney)
-                    await self._fill_eligibility_section(page, data.attorney)
-                
-                if data.passport:
-                    await self._fill_passport_section(page, data.passport)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                screenshot_path = self.screenshot_dir / f"form_filled_{timestamp}.png"
-                await page.screenshot(path=str(screenshot_path), full_page=True)
-                
-                if not self.headless:
-                    await page.wait_for_timeout(60000)
-                
-                return str(screenshot_path)
-                
-            except Exception as e:
-                logger.error(f"Form filling failed: {e}")
-                raise
-            finally:
-                await browser.close()
+            return str(screenshot_path)
+            
+        except Exception as e:
+            logger.error(f"Form filling failed: {e}")
+            raise
+        finally:
+            await context.close()
     
     async def _fill_attorney_section(self, page, attorney: AttorneyData):
         """Fill Part 1: Attorney/Representative Information."""
-        if attorney.online_account_number:
-            await page.locator('#online-account').fill(attorney.online_account_number)
-        if attorney.last_name:
-            await page.locator('#family-name').fill(attorney.last_name)
-        if attorney.first_name:
-            await page.locator('#given-name').fill(attorney.first_name)
-        if attorney.middle_name:
-            await page.locator('#middle-name').fill(attorney.middle_name)
-        if attorney.street_address:
-            await page.locator('#street-number').fill(attorney.street_address)
-        if attorney.apt_ste_flr:
-            await page.locator('#apt-number').fill(attorney.apt_ste_flr)
-        if attorney.city:
-            await page.locator('#city').fill(attorney.city)
-        if attorney.state:
-            state_code = self._normalize_state_code(attorney.state)
-            try:
-                await page.locator('#state').select_option(value=state_code)
-            except Exception:
-                pass
-        if attorney.zip_code:
-            await page.locator('#zip').fill(attorney.zip_code)
-        if attorney.country:
-            await page.locator('#country').fill(attorney.country)
-        if attorney.daytime_phone:
-            await page.locator('#daytime-phone').fill(attorney.daytime_phone)
-        if attorney.mobile_phone:
-            await page.locator('#mobile-phone').fill(attorney.mobile_phone)
-        if attorney.email:
-            await page.locator('#email').fill(str(attorney.email))
+        await self._fill_fields(page, {
+            '#online-account': attorney.online_account_number,
+            '#family-name': attorney.last_name,
+            '#given-name': attorney.first_name,
+            '#middle-name': attorney.middle_name,
+            '#street-number': attorney.street_address,
+            '#apt-number': attorney.apt_ste_flr,
+            '#city': attorney.city,
+            '#state': self._normalize_state_code(attorney.state) if attorney.state else None,
+            '#zip': attorney.zip_code,
+            '#country': attorney.country,
+            '#daytime-phone': attorney.daytime_phone,
+            '#mobile-phone': attorney.mobile_phone,
+            '#email': str(attorney.email) if attorney.email else None,
+        })
     
     async def _fill_eligibility_section(self, page, attorney: AttorneyData):
         """Fill Part 2: Eligibility Information."""
-        if attorney.licensing_authority:
-            await page.locator('#licensing-authority').fill(attorney.licensing_authority)
-        if attorney.bar_number:
-            await page.locator('#bar-number').fill(attorney.bar_number)
-        if attorney.law_firm_name:
-            await page.locator('#law-firm').fill(attorney.law_firm_name)
+        await self._fill_fields(page, {
+            '#licensing-authority': attorney.licensing_authority,
+            '#bar-number': attorney.bar_number,
+            '#law-firm': attorney.law_firm_name,
+        })
     
     async def _fill_passport_section(self, page, passport: PassportData):
         """Fill Part 3: Passport Information for Beneficiary."""
         part3 = page.locator('text=Part 3. Passport Information').first
         if await part3.count() > 0:
             await part3.scroll_into_view_if_needed()
-            await page.wait_for_timeout(500)
-        
-        if passport.last_name:
-            await page.locator('#passport-surname').fill(passport.last_name)
-        
-        # Handle duplicate ID bug in form (both first/middle name share same ID)
-        given_name_inputs = page.locator('#passport-given-names')
-        count = await given_name_inputs.count()
-        if count >= 1 and passport.first_name:
-            await given_name_inputs.nth(0).fill(passport.first_name)
-        if count >= 2 and passport.middle_name:
-            await given_name_inputs.nth(1).fill(passport.middle_name)
+            await page.locator('#passport-surname').wait_for(state='visible')
         
-        if passport.passport_number:
-            await page.locator('#passport-number').fill(passport.passport_number)
-        if passport.country_of_issue:
-            await page.locator('#passport-country').fill(passport.country_of_issue)
-        if passport.nationality:
-            await page.locator('#passport-nationality').fill(passport.nationality)
-        if passport.date_of_birth:
-            await page.locator('#passport-dob').fill(self._normalize_date(passport.date_of_birth))
-        if passport.place_of_birth:
-            await page.locator('#passport-pob').fill(passport.place_of_birth)
-        if passport.sex:
-            try:
-                await page.locator('#passport-sex').select_option(value=passport.sex)
-            except:
-                pass
-        if passport.date_of_issue:
-            await page.locator('#passport-issue-date').fill(self._normalize_date(passport.date_of_issue))
-        if passport.date_of_expiration:
-            await page.locator('#passport-expiry-date').fill(self._normalize_date(passport.date_of_expiration))
+        await self._fill_fields(page, {
+            '#passport-surname': passport.last_name,
+            # Handle duplicate ID bug in form (both first/middle name share same ID)
+            '#passport-given-names': [passport.first_name, passport.middle_name],
+            '#passport-number': passport.passport_number,
+            '#passport-country': passport.country_of_issue,
+            '#passport-nationality': passport.nationality,
+            '#passport-dob': normalize_date(passport.date_of_birth),
+            '#passport-pob': passport.place_of_birth,
+            '#passport-sex': passport.sex,
+            '#passport-issue-date': normalize_date(passport.date_of_issue),
+            '#passport-expiry-date': normalize_date(passport.date_of_expiration),
+        })
+    
+    async def _fill_fields(self, page, fields: dict):
+        """Set every field of a section in one round trip to the browser."""
+        await page.evaluate(_FILL_FIELDS_JS, fields)
     
     def _normalize_state_code(self, state: str) -> str:
         """Convert state name to 2-letter code."""
-        if len(state) == 2:
-            return state.upper()
-        return STATE_CODES.get(state.lower(), state.upper()[:2])
-    
-    def _normalize_date(self, date_str: str) -> str:
-        """Normalize date to YYYY-MM-DD format."""
-        if not date_str:
-            return ""
-        if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-            return date_str
-        try:
-            import dateparser
-            parsed = dateparser.parse(date_str)
-            if parsed:
-                return parsed.strftime("%Y-%m-%d")
-        except:
-            pass
-        return date_str
+        code = state.upper()
+        if len(state) == 2 and code in _VALID_CODES:
+            return code
+        return STATE_CODES.get(state.lower(), code[:2])
 
 
 async def fill_form_from_data(data: ExtractedFormData, headless: bool = False) -> Optional[str]:
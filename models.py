@@ -1,9 +1,23 @@
-"""Pydantic data models for document extraction."""
-from typing import Optional, Literal
-from pydantic import BaseModel, Field, EmailStr
+"""Data models for document extraction.
 
+Slotted dataclasses are cheap to build while extracting, and construction does not
+validate them. The one exception is AttorneyData.email, which is dropped to None
+when it is not a valid address. Sessions are validated against these annotations
+when they are stored (see session_store).
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Annotated, Optional, Literal
+from pydantic import Field, EmailStr, TypeAdapter, ValidationError
 
-class PassportData(BaseModel):
+Confidence = Annotated[Optional[float], Field(ge=0.0, le=1.0)]
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+@dataclass(slots=True)
+class PassportData:
     """Extracted passport data."""
     last_name: Optional[str] = None
     first_name: Optional[str] = None
@@ -17,10 +31,11 @@ class PassportData(BaseModel):
     date_of_issue: Optional[str] = None
     date_of_expiration: Optional[str] = None
     extraction_method: Optional[str] = None
-    confidence_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    confidence_score: Confidence = None
 
 
-class AttorneyData(BaseModel):
+@dataclass(slots=True)
+class AttorneyData:
     """Extracted G-28 attorney data."""
     last_name: Optional[str] = None
     first_name: Optional[str] = None
@@ -39,18 +54,27 @@ class AttorneyData(BaseModel):
     law_firm_name: Optional[str] = None
     online_account_number: Optional[str] = None
     extraction_method: Optional[str] = None
-    confidence_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    confidence_score: Confidence = None
 
+    def __post_init__(self):
+        #a badly OCR'd address is dropped rather than failing the whole extraction
+        if self.email:
+            try:
+                _email_adapter.validate_python(self.email)
+            except ValidationError:
+                self.email = None
 
-class ExtractedFormData(BaseModel):
+
+@dataclass(slots=True)
+class ExtractedFormData:
     """Combined extraction results."""
     passport: Optional[PassportData] = None
     attorney: Optional[AttorneyData] = None
-    raw_text: Optional[dict] = Field(default_factory=dict)
-    errors: list[str] = Field(default_factory=list)
+    raw_text: Optional[dict] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
 
 
-US_STATES = {
+US_STATES = MappingProxyType({
     "alabama": "AL", "al": "AL", "alaska": "AK", "ak": "AK",
     "arizona": "AZ", "az": "AZ", "arkansas": "AR", "ar": "AR",
     "california": "CA", "ca": "CA", "colorado": "CO", "co": "CO",
@@ -77,11 +101,37 @@ US_STATES = {
     "virginia": "VA", "va": "VA", "washington": "WA", "wa": "WA",
     "west virginia": "WV", "wv": "WV", "wisconsin": "WI", "wi": "WI",
     "wyoming": "WY", "wy": "WY",
-}
+})
+_VALID_CODES = frozenset(US_STATES.values())
 
 
 def normalize_state(state_str: Optional[str]) -> Optional[str]:
     """Normalize state to 2-letter code."""
     if not state_str:
         return None
+    code = state_str.strip().upper()
+    if code in _VALID_CODES:
+        return code
     return US_STATES.get(state_str.lower().strip(), state_str.upper()[:2])
+
+
+@lru_cache(maxsize=1)
+def _date_parser():
+    """English-only dateparser, built once instead of re-detecting languages on every call."""
+    from dateparser.date import DateDataParser
+    return DateDataParser(languages=["en"])
+
+
+def normalize_date(date_str: Optional[str]) -> Optional[str]:
+    """Normalize date to YYYY-MM-DD, returning it unchanged if it can't be parsed."""
+    if not date_str:
+        return None
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        return date_str
+    try:
+        parsed = _date_parser().get_date_data(date_str).date_obj
+        if parsed:
+            return parsed.strftime("%Y-%m-%d")
+    except Exception:
+        pass
+    return date_str
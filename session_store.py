@@ -0,0 +1,111 @@
+"""
+Session storage for extraction results.
+Sessions are kept in Redis with a TTL so every worker process sees the same state.
+Without REDIS_URL, a bounded in-process TTL cache is used instead (single worker only).
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, Optional
+
+import redis.asyncio as redis
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+
+from models import ExtractedFormData
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = 3600
+MAX_MEMORY_SESSIONS = 10_000
+
+_session_adapter = TypeAdapter(ExtractedFormData)
+
+
+def _serialize(data: ExtractedFormData) -> bytes:
+    """Dump session data, failing before the write if it would not load back."""
+    raw = _session_adapter.dump_json(data)
+    _session_adapter.validate_json(raw)
+    return raw
+
+
+class SessionStore:
+    """Redis-backed store of ExtractedFormData keyed by session id."""
+
+    def __init__(self, url: Optional[str] = None, ttl: int = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._redis = redis.from_url(url or os.getenv("REDIS_URL", "redis://localhost"))
+
+    def _key(self, session_id: str) -> str:
+        return f"sess:{session_id}"
+
+    async def get(self, session_id: str) -> Optional[ExtractedFormData]:
+        """Load session data, or None if missing/expired."""
+        raw = await self._redis.get(self._key(session_id))
+        return _session_adapter.validate_json(raw) if raw else None
+
+    async def set(self, session_id: str, data: ExtractedFormData) -> None:
+        """Save session data and reset its TTL."""
+        await self._redis.set(self._key(session_id), _serialize(data), ex=self.ttl)
+
+    async def update(self, session_id: str, mutate: Callable[[ExtractedFormData], None]) -> ExtractedFormData:
+        """Read-modify-write session data atomically, creating it if missing."""
+        key = self._key(session_id)
+
+        async def apply(pipe) -> ExtractedFormData:
+            raw = await pipe.get(key)
+            data = _session_adapter.validate_json(raw) if raw else ExtractedFormData()
+            mutate(data)
+            raw = _serialize(data)
+            pipe.multi()
+            pipe.set(key, raw, ex=self.ttl)
+            return data
+
+        #WATCH retries apply() if another worker wrote the session in between
+        return await self._redis.transaction(apply, key, value_from_callable=True)
+
+    async def delete(self, session_id: str) -> bool:
+        """Delete session data. Returns False if it did not exist."""
+        return bool(await self._redis.delete(self._key(session_id)))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class MemorySessionStore:
+    """In-process store bounded by size and TTL, for single-worker deployments.
+    Sessions are kept serialized as in Redis, so both stores accept the same data."""
+
+    def __init__(self, maxsize: int = MAX_MEMORY_SESSIONS, ttl: int = SESSION_TTL_SECONDS):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    async def get(self, session_id: str) -> Optional[ExtractedFormData]:
+        raw = self._cache.get(session_id)
+        return _session_adapter.validate_json(raw) if raw else None
+
+    async def set(self, session_id: str, data: ExtractedFormData) -> None:
+        self._cache[session_id] = _serialize(data)
+
+    async def update(self, session_id: str, mutate: Callable[[ExtractedFormData], None]) -> ExtractedFormData:
+        async with self._lock:
+            raw = self._cache.get(session_id)
+            data = _session_adapter.validate_json(raw) if raw else ExtractedFormData()
+            mutate(data)
+            self._cache[session_id] = _serialize(data)
+            return data
+
+    async def delete(self, session_id: str) -> bool:
+        return self._cache.pop(session_id, None) is not None
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+
+def create_session_store():
+    """Redis store when REDIS_URL is set, otherwise the in-memory fallback."""
+    url = os.getenv("REDIS_URL")
+    if url:
+        return SessionStore(url)
+    logger.warning("REDIS_URL not set, keeping sessions in memory (not shared across workers)")
+    return MemorySessionStore()
@@ -26,9 +26,9 @@ fi
 echo ""
 echo "Installing system dependencies..."
 if [ "${OS_TYPE}" = "Mac" ]; then
-    brew install tesseract poppler 2>/dev/null || true
+    brew install tesseract leptonica pkg-config poppler redis 2>/dev/null || true
 elif [ "${OS_TYPE}" = "Linux" ]; then
-    sudo apt-get update && sudo apt-get install -y tesseract-ocr poppler-utils
+    sudo apt-get update && sudo apt-get install -y tesseract-ocr libtesseract-dev libleptonica-dev pkg-config poppler-utils redis-server
 fi
 
 # Create virtual environment
@@ -47,7 +47,7 @@ echo "Installing Playwright..."
 playwright install chromium
 
 # Create directories
-mkdir -p uploads screenshots
+mkdir -p screenshots
 
 echo ""
 echo "========================================="